@@ -26,8 +26,27 @@ class DbConfig():
 
         self.music_sheets_base_path = os.path.join(self.resources_dir,
                                                    'music_sheets')
-        assert os.path.isdir(self.music_sheets_base_path), \
-            f"Not a directory: {self.music_sheets_base_path}"
+
+        # backend storing the music sheet files: 'local' keeps them in
+        # music_sheets_base_path, 's3' in a bucket of an S3 compatible
+        # object store (requires boto3, credentials are read by boto3 from
+        # its usual sources, e.g. AWS_ACCESS_KEY_ID/AWS_SECRET_ACCESS_KEY).
+        self.storage_backend = 'local'
+        self.s3_endpoint_url = None  # e.g. 'http://localhost:9000' for MinIO
+        self.s3_bucket = 'music-sheets'
+        self.s3_region = None
+        self.s3_prefix = ''
+        # 'auto', 'virtual' or 'path', MinIO endpoints usually need 'path'.
+        self.s3_addressing_style = 'auto'
+        self.s3_max_pool_connections = 10
+        self.s3_multipart_threshold = 8 * 1024 ** 2
+        self.s3_multipart_chunksize = 8 * 1024 ** 2
+        self.s3_max_concurrency = 4
+        self.s3_url_expiration = 3600
+
+        if self.storage_backend == 'local':
+            assert os.path.isdir(self.music_sheets_base_path), \
+                f"Not a directory: {self.music_sheets_base_path}"
 
 
 DB_CONFIG = DbConfig()
@@ -13,6 +13,7 @@ class GBCJSONEncoder(JSONEncoder):
                 'composer': obj.composer,
                 'arranger': obj.arranger,
                 'date_added': obj.date_added.strftime("%d-%m-%Y"),
+                # one storage listing per sheet, on S3 a request each.
                 'instruments': obj.instruments
             }
         else:
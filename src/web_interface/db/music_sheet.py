@@ -4,10 +4,9 @@ from sqlalchemy import Column, Integer, String, Date
 from sqlalchemy import exc, event, and_, or_
 import datetime
 import os
-import glob
-import shutil
-from db.db_config import DB_CONFIG
+import posixpath
 from db.session_manager import Base, SessionManager
+from db.storage import STORAGE
 
 
 class MusicSheet(Base):
@@ -22,8 +21,6 @@ class MusicSheet(Base):
     _date_added = Column('date_added', Date, nullable=True, index=True)
 
     def __init__(self, title, composer=None, arranger=None):
-        assert os.path.isdir(DB_CONFIG.music_sheets_base_path)
-
         self.title = title
         self.arranger = arranger
         self.composer = composer
@@ -75,7 +72,7 @@ class MusicSheet(Base):
 
     @property
     def files_path(self):
-        return os.path.join(DB_CONFIG.music_sheets_base_path, self._files_path)
+        return STORAGE.location(self._files_path)
 
     @title.setter
     def title(self, title):
@@ -97,72 +94,81 @@ class MusicSheet(Base):
     def files_path(self, files_path):
         self._files_path = files_path
 
+    def _instrument_key(self, instrument_name):
+        instrument_name = instrument_name.strip().lower().replace(' ', '_')
+        return posixpath.join(self._files_path, instrument_name)
+
+    def _instrument_file_prefix(self, instrument_name, number):
+        instrument_name = instrument_name.strip().lower().replace(' ', '_')
+        file_prefix = self.title.strip().lower().replace(' ', '_')
+        return file_prefix + f"_{instrument_name}_{number}"
+
     def add_instrument_sheet(self, instrument_name, number, file_path):
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"{file_path} does not exist")
-        base_dir = self.files_path
-        instrument_name = instrument_name.strip().lower().replace(' ', '_')
-        instrument_dir = os.path.join(base_dir, instrument_name)
-        if not os.path.isdir(instrument_dir):
-            os.mkdir(instrument_dir)
         _, extension = os.path.splitext(file_path)
-        dst_file = self.title.strip().lower().replace(' ', '_')
-        dst_file += f"_{instrument_name}_{number}{extension}"
-        dst_file = os.path.join(instrument_dir, dst_file)
-        if os.path.exists(dst_file):
-            raise FileExistsError(f"{dst_file} already exists")
-        shutil.copy2(file_path, dst_file)
+        dst_file = self._instrument_file_prefix(instrument_name, number)
+        dst_file += extension
+        dst_key = posixpath.join(self._instrument_key(instrument_name),
+                                 dst_file)
+        STORAGE.put_file(file_path, dst_key)
+
+    def _instrument_sheet_files(self, instrument_name, number):
+        """Return the keys of the files of the given instrument sheet,
+        empty if the instrument does not exist"""
+        instrument_key = self._instrument_key(instrument_name)
+        try:
+            file_names = STORAGE.list_files(instrument_key)
+        except FileNotFoundError:
+            return []
+        file_prefix = self._instrument_file_prefix(instrument_name, number)
+        return [posixpath.join(instrument_key, file_name)
+                for file_name in file_names
+                if os.path.splitext(file_name)[0] == file_prefix]
 
     def remove_instrument_sheet(self, instrument_name, number):
         retval = False
-        base_dir = self.files_path
-        instrument_name = instrument_name.strip().lower().replace(' ', '_')
-        instrument_dir = os.path.join(base_dir, instrument_name)
-        if os.path.isdir(instrument_dir):
-            dst_files = self.title.strip().lower().replace(' ', '_')
-            dst_files += f"_{instrument_name}_{number}*"
-            dst_files = os.path.join(instrument_dir, dst_files)
-            for dst_file in glob.glob(dst_files):
-                os.remove(dst_file)
-                retval = True
+        for dst_file in self._instrument_sheet_files(instrument_name, number):
+            STORAGE.remove_file(dst_file)
+            retval = True
+        return retval
+
+    def instrument_sheet_urls(self, instrument_name, number):
+        """Return the download URLs of the files of the given instrument
+        sheet, empty if the instrument does not exist or if the storage can
+        not serve the files directly"""
+        retval = []
+        for dst_file in self._instrument_sheet_files(instrument_name, number):
+            url = STORAGE.download_url(dst_file)
+            if url is not None:
+                retval.append(url)
         return retval
 
     @property
     def instruments(self):
-        base_dir = self.files_path
-        return [name for name in os.listdir(base_dir)
-                if os.path.isdir(os.path.join(base_dir, name))]
+        return STORAGE.list_dirs(self._files_path)
 
     def numbers_for_instrument(self, instrument_name):
         retval = []
-        base_dir = self.files_path
-        instrument_name = instrument_name.strip().lower().replace(' ', '_')
-        instrument_dir = os.path.join(base_dir, instrument_name)
-        if not os.path.isdir(instrument_dir):
-            raise FileNotFoundError(f"{instrument_dir} does not exist")
-        for file_name in os.listdir(instrument_dir):
-            if os.path.isfile(os.path.join(instrument_dir, file_name)):
-                name, _ = os.path.splitext(file_name)
-                pos = name.rfind('_')
-                try:
-                    num = int(name[pos + 1:])
-                except ValueError:
-                    raise ImportWarning("Malformed file name: {file_name}")
-                retval.append(num)
+        instrument_key = self._instrument_key(instrument_name)
+        for file_name in STORAGE.list_files(instrument_key):
+            name, _ = os.path.splitext(file_name)
+            pos = name.rfind('_')
+            try:
+                num = int(name[pos + 1:])
+            except ValueError:
+                raise ImportWarning("Malformed file name: {file_name}")
+            retval.append(num)
         return retval
 
     def _insert_call_back(mapper, connection, target):
-        files_dir = target.files_path
-        assert not os.path.exists(files_dir)
-        os.mkdir(files_dir)
+        STORAGE.make_dir(target._files_path)
 
     def _delete_call_back(mapper, connection, target):
         target.delete()
 
     def delete(self):
-        files_dir = self.files_path
-        if os.path.isdir(files_dir):
-            shutil.rmtree(os.path.abspath(files_dir))
+        STORAGE.remove_dir(self._files_path)
 
 
 # add annotation to callbacks, can not access MusicSheet from within
@@ -221,23 +227,17 @@ class MusicSheetMgr(object):
     def check_consistency(session):
         inconsistencies_missing_in_fs = []
         inconsistencies_missing_in_db = []
-        base_dir = DB_CONFIG.music_sheets_base_path
         # get all sheets in db.
         db_sheets = MusicSheetMgr.search(session, sort_asc_title=False)
-        # get all sheets from file system.
-        fs_sheets = set()
-        for f in os.listdir(base_dir):
-            f_abs = os.path.join(base_dir, f)
-            if os.path.isdir(f_abs):
-                fs_sheets.add(f_abs)
+        # get all sheets from storage.
+        fs_sheets = set(STORAGE.location(f) for f in STORAGE.list_dirs(''))
 
         # collect set of paths in db
         paths_in_db = set()
         for db_sheet in db_sheets:
             paths_in_db.add(db_sheet.files_path)
             if db_sheet.files_path not in fs_sheets:
-                assert not os.path.isdir(os.path.join(base_dir,
-                                                      db_sheet.files_path)), \
+                assert not STORAGE.is_dir(db_sheet._files_path), \
                         f"{db_sheet}\n{fs_sheets}"
                 inconsistencies_missing_in_fs.append(db_sheet)
 
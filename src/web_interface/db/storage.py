@@ -0,0 +1,310 @@
+#! /usr/bin/python3
+
+import os
+import posixpath
+import shutil
+from abc import ABC, abstractmethod
+from db.db_config import DB_CONFIG
+
+
+class Storage(ABC):
+    """Interface of the backends storing the music sheet files.
+
+    Files are addressed by keys, '/' separated paths relative to the root of
+    the storage, e.g. 'title/instrument/title_instrument_1.pdf'. The root,
+    key '', always exists. Directories exist until they are removed with
+    remove_dir, also when they are empty.
+    """
+
+    @abstractmethod
+    def location(self, key):
+        """Return a human readable location of key"""
+        pass
+
+    @abstractmethod
+    def make_dir(self, key):
+        """Create the directory key, raise FileExistsError if it exists"""
+        pass
+
+    @abstractmethod
+    def is_dir(self, key):
+        """Return whether key is an existing directory"""
+        pass
+
+    @abstractmethod
+    def list_dirs(self, key):
+        """Return the names of the directories directly inside key,
+        raise FileNotFoundError if key is not a directory"""
+        pass
+
+    @abstractmethod
+    def list_files(self, key):
+        """Return the names of the files directly inside key,
+        raise FileNotFoundError if key is not a directory"""
+        pass
+
+    @abstractmethod
+    def put_file(self, file_path, key):
+        """Copy the local file file_path to key, creating its parent
+        directory if missing. Raise FileExistsError if key already exists,
+        FileNotFoundError if the parent of the parent directory is missing"""
+        pass
+
+    @abstractmethod
+    def remove_file(self, key):
+        """Remove the file key, raise FileNotFoundError if it is missing,
+        its directory is kept"""
+        pass
+
+    @abstractmethod
+    def remove_dir(self, key):
+        """Recursively remove the directory key and all its content,
+        do nothing if it is missing"""
+        pass
+
+    def download_url(self, key):
+        """Return an URL from which key can be downloaded without going
+        through the application, None if the backend does not support it"""
+        return None
+
+
+class LocalStorage(Storage):
+    """Store files in a directory of the local file system"""
+
+    def __init__(self, base_path):
+        assert os.path.isdir(base_path), f"Not a directory: {base_path}"
+        self._base_path = base_path
+
+    def _path(self, key):
+        return os.path.join(self._base_path, *key.split('/'))
+
+    def location(self, key):
+        return self._path(key)
+
+    def make_dir(self, key):
+        os.mkdir(self._path(key))
+
+    def is_dir(self, key):
+        return os.path.isdir(self._path(key))
+
+    def list_dirs(self, key):
+        base_dir = self._path(key)
+        return [name for name in os.listdir(base_dir)
+                if os.path.isdir(os.path.join(base_dir, name))]
+
+    def list_files(self, key):
+        base_dir = self._path(key)
+        if not os.path.isdir(base_dir):
+            raise FileNotFoundError(f"{base_dir} does not exist")
+        return [name for name in os.listdir(base_dir)
+                if os.path.isfile(os.path.join(base_dir, name))]
+
+    def put_file(self, file_path, key):
+        dst_file = self._path(key)
+        dst_dir = os.path.dirname(dst_file)
+        if not os.path.isdir(dst_dir):
+            os.mkdir(dst_dir)
+        if os.path.exists(dst_file):
+            raise FileExistsError(f"{dst_file} already exists")
+        shutil.copy2(file_path, dst_file)
+
+    def remove_file(self, key):
+        os.remove(self._path(key))
+
+    def remove_dir(self, key):
+        files_dir = self._path(key)
+        if os.path.isdir(files_dir):
+            shutil.rmtree(os.path.abspath(files_dir))
+
+
+class S3Storage(Storage):
+    """Store files in a bucket of an S3 compatible object store (AWS, MinIO).
+
+    Directories do not exist in object stores, a directory is the common
+    prefix of the keys it contains. make_dir and put_file also write a zero
+    bytes marker object whose key ends with '/', so that a directory
+    survives the removal of its last file as it does on a file system.
+
+    put_file and make_dir check for existing keys before writing, the check
+    is not atomic: two workers concurrently writing the same key can
+    overwrite each other, the last upload wins.
+    """
+
+    # maximum number of keys accepted by a single DeleteObjects request.
+    _DELETE_BATCH_SIZE = 1000
+
+    def __init__(self, bucket, endpoint_url=None, region=None, prefix='',
+                 addressing_style='auto', max_pool_connections=10,
+                 multipart_threshold=8 * 1024 ** 2,
+                 multipart_chunksize=8 * 1024 ** 2, max_concurrency=4,
+                 url_expiration=3600):
+        # boto3 is only required when this backend is used.
+        import boto3
+        from botocore.config import Config
+        from boto3.s3.transfer import TransferConfig
+
+        self._bucket = bucket
+        self._prefix = prefix.strip('/')
+        self._url_expiration = url_expiration
+        # the client is thread safe and shared by all the requests served
+        # by this process, its connections are pooled by botocore.
+        config = Config(max_pool_connections=max_pool_connections,
+                        s3={'addressing_style': addressing_style})
+        self._client = boto3.client('s3', endpoint_url=endpoint_url,
+                                    region_name=region, config=config)
+        # big files are uploaded in parts by max_concurrency threads.
+        self._transfer_config = \
+            TransferConfig(multipart_threshold=multipart_threshold,
+                           multipart_chunksize=multipart_chunksize,
+                           max_concurrency=max_concurrency,
+                           use_threads=True)
+
+    def _key(self, key):
+        return posixpath.join(self._prefix, key) if self._prefix else key
+
+    def _dir_key(self, key):
+        # the root of the storage is the empty prefix, object keys never
+        # start with '/'.
+        dir_key = self._key(key).strip('/')
+        return dir_key + '/' if dir_key else ''
+
+    def _list(self, key, recursive=False):
+        """Yield the pages of the listing of directory key"""
+        paginator = self._client.get_paginator('list_objects_v2')
+        args = {
+            'Bucket': self._bucket,
+            'Prefix': self._dir_key(key),
+            'PaginationConfig': {'PageSize': 1000}
+        }
+        if not recursive:
+            args['Delimiter'] = '/'
+        return paginator.paginate(**args)
+
+    def _has_object(self, s3_key):
+        from botocore.exceptions import ClientError
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=s3_key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def location(self, key):
+        return f"s3://{self._bucket}/{self._key(key)}"
+
+    def make_dir(self, key):
+        if self.is_dir(key):
+            raise FileExistsError(f"{self.location(key)} already exists")
+        self._client.put_object(Bucket=self._bucket, Key=self._dir_key(key),
+                                Body=b'')
+
+    def is_dir(self, key):
+        if not self._dir_key(key):
+            # the root always exists, even in an empty bucket.
+            return True
+        response = self._client.list_objects_v2(Bucket=self._bucket,
+                                                Prefix=self._dir_key(key),
+                                                MaxKeys=1)
+        return response.get('KeyCount', 0) > 0
+
+    def _list_dir(self, key):
+        """Return the names of the directories and of the files directly
+        inside key, collected in a single paginated listing"""
+        dir_key = self._dir_key(key)
+        found = not dir_key
+        dirs = []
+        files = []
+        for page in self._list(key):
+            found = found or page.get('KeyCount', 0) > 0
+            for common_prefix in page.get('CommonPrefixes', []):
+                name = common_prefix['Prefix'][len(dir_key):].rstrip('/')
+                dirs.append(name)
+            for obj in page.get('Contents', []):
+                name = obj['Key'][len(dir_key):]
+                # skip the directory marker.
+                if name:
+                    files.append(name)
+        if not found:
+            raise FileNotFoundError(f"{self.location(key)} does not exist")
+        return dirs, files
+
+    def list_dirs(self, key):
+        dirs, _ = self._list_dir(key)
+        return dirs
+
+    def list_files(self, key):
+        _, files = self._list_dir(key)
+        return files
+
+    def put_file(self, file_path, key):
+        s3_key = self._key(key)
+        if self._has_object(s3_key):
+            raise FileExistsError(f"{self.location(key)} already exists")
+        dir_key = posixpath.dirname(key)
+        if not self.is_dir(dir_key):
+            if not self.is_dir(posixpath.dirname(dir_key)):
+                raise FileNotFoundError(
+                    f"{self.location(posixpath.dirname(dir_key))} "
+                    "does not exist")
+            # the marker keeps the directory when its last file is removed.
+            self._client.put_object(Bucket=self._bucket,
+                                    Key=self._dir_key(dir_key), Body=b'')
+        self._client.upload_file(file_path, self._bucket, s3_key,
+                                 Config=self._transfer_config)
+
+    def remove_file(self, key):
+        s3_key = self._key(key)
+        if not self._has_object(s3_key):
+            raise FileNotFoundError(f"{self.location(key)} does not exist")
+        self._client.delete_object(Bucket=self._bucket, Key=s3_key)
+
+    def remove_dir(self, key):
+        batch = []
+        for page in self._list(key, recursive=True):
+            for obj in page.get('Contents', []):
+                batch.append({'Key': obj['Key']})
+                if len(batch) == self._DELETE_BATCH_SIZE:
+                    self._delete_batch(batch)
+                    batch = []
+        if batch:
+            self._delete_batch(batch)
+
+    def _delete_batch(self, batch):
+        response = \
+            self._client.delete_objects(Bucket=self._bucket,
+                                        Delete={'Objects': batch,
+                                                'Quiet': True})
+        errors = response.get('Errors', [])
+        if errors:
+            failed = ', '.join(f"{error['Key']} ({error.get('Code')})"
+                               for error in errors)
+            raise OSError(f"Could not delete {len(errors)} objects from "
+                          f"{self._bucket}: {failed}")
+
+    def download_url(self, key):
+        return self._client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self._bucket, 'Key': self._key(key)},
+            ExpiresIn=self._url_expiration)
+
+
+def create_storage(config):
+    """Build the storage backend selected in config"""
+    if config.storage_backend == 'local':
+        return LocalStorage(config.music_sheets_base_path)
+    if config.storage_backend == 's3':
+        return S3Storage(config.s3_bucket,
+                         endpoint_url=config.s3_endpoint_url,
+                         region=config.s3_region,
+                         prefix=config.s3_prefix,
+                         addressing_style=config.s3_addressing_style,
+                         max_pool_connections=config.s3_max_pool_connections,
+                         multipart_threshold=config.s3_multipart_threshold,
+                         multipart_chunksize=config.s3_multipart_chunksize,
+                         max_concurrency=config.s3_max_concurrency,
+                         url_expiration=config.s3_url_expiration)
+    raise ValueError(f"Unknown storage backend: {config.storage_backend}")
+
+
+STORAGE = create_storage(DB_CONFIG)
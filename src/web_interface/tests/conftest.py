@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of the web interface are imported as top level packages (db.*).
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
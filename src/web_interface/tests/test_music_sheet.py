@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+import db.music_sheet  # noqa: E402
+from db.music_sheet import MusicSheet  # noqa: E402
+from db.storage import LocalStorage  # noqa: E402
+
+
+class UrlStorage(LocalStorage):
+    """LocalStorage that pretends to serve files directly"""
+
+    def download_url(self, key):
+        return f"http://files/{key}"
+
+
+@pytest.fixture
+def sheet(tmp_path, monkeypatch):
+    storage = UrlStorage(str(tmp_path))
+    monkeypatch.setattr(db.music_sheet, 'STORAGE', storage)
+    sheet = MusicSheet(title='Title')
+    storage.make_dir(sheet._files_path)
+    src_file = tmp_path / 'sheet.pdf'
+    src_file.write_bytes(b'%PDF-1.4')
+    sheet.add_instrument_sheet('Violin', 1, str(src_file))
+    sheet.add_instrument_sheet('Violin', 10, str(src_file))
+    return sheet
+
+
+def test_instrument_sheet_urls(sheet):
+    assert sheet.instrument_sheet_urls('Violin', 1) == \
+        ['http://files/title/violin/title_violin_1.pdf']
+    assert sheet.instrument_sheet_urls('Tuba', 1) == []
+
+
+def test_remove_instrument_sheet(sheet):
+    assert sheet.remove_instrument_sheet('Violin', 1)
+    assert sheet.numbers_for_instrument('Violin') == [10]
+    assert not sheet.remove_instrument_sheet('Violin', 1)
+    assert not sheet.remove_instrument_sheet('Tuba', 1)
@@ -0,0 +1,192 @@
+import os
+import uuid
+import pytest
+from db.storage import Storage, LocalStorage, S3Storage
+
+# set to run the S3 tests against a real endpoint too, e.g. a local MinIO,
+# the bucket is created if missing:
+#   docker run -p 9000:9000 minio/minio server /data
+#   MUSIC_CATALOG_S3_ENDPOINT_URL=http://localhost:9000 \
+#   MUSIC_CATALOG_S3_BUCKET=music-sheets \
+#   AWS_ACCESS_KEY_ID=minioadmin AWS_SECRET_ACCESS_KEY=minioadmin pytest
+S3_ENDPOINT_URL = os.environ.get('MUSIC_CATALOG_S3_ENDPOINT_URL')
+S3_BUCKET = os.environ.get('MUSIC_CATALOG_S3_BUCKET', 'music-sheets')
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalStorage(str(tmp_path))
+
+
+@pytest.fixture
+def moto_storage(monkeypatch):
+    moto = pytest.importorskip('moto')
+    pytest.importorskip('boto3')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        storage = S3Storage(S3_BUCKET, region='us-east-1')
+        storage._client.create_bucket(Bucket=S3_BUCKET)
+        yield storage
+
+
+@pytest.fixture
+def minio_storage():
+    if S3_ENDPOINT_URL is None:
+        pytest.skip('MUSIC_CATALOG_S3_ENDPOINT_URL not set')
+    pytest.importorskip('boto3')
+    from botocore.exceptions import ClientError
+    # every test works in its own prefix of the shared bucket.
+    storage = S3Storage(S3_BUCKET, endpoint_url=S3_ENDPOINT_URL,
+                        prefix=f"test_{uuid.uuid4().hex}",
+                        addressing_style='path')
+    try:
+        storage._client.create_bucket(Bucket=S3_BUCKET)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('BucketAlreadyOwnedByYou',
+                                               'BucketAlreadyExists'):
+            raise
+    yield storage
+    storage.remove_dir('')
+
+
+@pytest.fixture(params=['local_storage', 'moto_storage', 'minio_storage'])
+def storage(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture
+def sheet_file(tmp_path_factory):
+    file_path = tmp_path_factory.mktemp('src') / 'sheet.pdf'
+    file_path.write_bytes(b'%PDF-1.4')
+    return str(file_path)
+
+
+def test_incomplete_backend_can_not_be_created():
+    class IncompleteStorage(Storage):
+        def location(self, key):
+            return key
+
+    with pytest.raises(TypeError):
+        IncompleteStorage()
+
+
+def test_make_dir(storage):
+    assert not storage.is_dir('title')
+    storage.make_dir('title')
+    assert storage.is_dir('title')
+    with pytest.raises(FileExistsError):
+        storage.make_dir('title')
+
+
+def test_list_dirs(storage, sheet_file):
+    storage.make_dir('title')
+    storage.make_dir('other')
+    storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    assert sorted(storage.list_dirs('')) == ['other', 'title']
+    assert storage.list_dirs('title') == ['violin']
+    assert storage.list_dirs('other') == []
+
+
+def test_list_dirs_root_without_prefix(moto_storage):
+    moto_storage.make_dir('title')
+    assert moto_storage.list_dirs('') == ['title']
+    assert moto_storage.location('title') == 's3://music-sheets/title'
+
+
+def test_list_files(storage, sheet_file):
+    storage.make_dir('title')
+    storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    storage.put_file(sheet_file, 'title/violin/title_violin_10.pdf')
+    assert sorted(storage.list_files('title/violin')) == \
+        ['title_violin_1.pdf', 'title_violin_10.pdf']
+    assert storage.list_files('title') == []
+    with pytest.raises(FileNotFoundError):
+        storage.list_files('title/tuba')
+
+
+def test_put_file_existing(storage, sheet_file):
+    storage.make_dir('title')
+    storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    with pytest.raises(FileExistsError):
+        storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+
+
+def test_remove_file(storage, sheet_file):
+    storage.make_dir('title')
+    storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    storage.put_file(sheet_file, 'title/violin/title_violin_2.pdf')
+    storage.remove_file('title/violin/title_violin_1.pdf')
+    assert storage.list_files('title/violin') == ['title_violin_2.pdf']
+
+
+def test_remove_last_file_keeps_dir(storage, sheet_file):
+    storage.make_dir('title')
+    storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    storage.remove_file('title/violin/title_violin_1.pdf')
+    assert storage.is_dir('title/violin')
+    assert storage.list_dirs('title') == ['violin']
+    assert storage.list_files('title/violin') == []
+
+
+def test_list_missing_dir(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.list_dirs('title')
+    with pytest.raises(FileNotFoundError):
+        storage.list_files('title')
+
+
+def test_list_empty_root(storage):
+    assert storage.is_dir('')
+    assert storage.list_dirs('') == []
+    assert storage.list_files('') == []
+
+
+def test_put_file_missing_parent(storage, sheet_file):
+    with pytest.raises(FileNotFoundError):
+        storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    assert not storage.is_dir('title')
+
+
+def test_remove_missing_file(storage):
+    storage.make_dir('title')
+    with pytest.raises(FileNotFoundError):
+        storage.remove_file('title/title_violin_1.pdf')
+
+
+def test_remove_dir(storage, sheet_file):
+    storage.make_dir('title')
+    storage.make_dir('other')
+    storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    storage.put_file(sheet_file, 'title/tuba/title_tuba_1.pdf')
+    storage.remove_dir('title')
+    assert not storage.is_dir('title')
+    assert storage.list_dirs('') == ['other']
+    # removing a missing directory is not an error.
+    storage.remove_dir('title')
+
+
+def test_remove_dir_errors(moto_storage, sheet_file, monkeypatch):
+    moto_storage.make_dir('title')
+    moto_storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+
+    def delete_objects(**kwargs):
+        return {'Errors': [{'Key': 'title/violin/title_violin_1.pdf',
+                            'Code': 'AccessDenied'}]}
+
+    monkeypatch.setattr(moto_storage._client, 'delete_objects',
+                        delete_objects)
+    with pytest.raises(OSError, match='title_violin_1.pdf'):
+        moto_storage.remove_dir('title')
+
+
+def test_download_url(local_storage, moto_storage, sheet_file):
+    for storage in (local_storage, moto_storage):
+        storage.make_dir('title')
+        storage.put_file(sheet_file, 'title/violin/title_violin_1.pdf')
+    assert local_storage.download_url('title/violin/title_violin_1.pdf') \
+        is None
+    url = moto_storage.download_url('title/violin/title_violin_1.pdf')
+    assert 'title/violin/title_violin_1.pdf' in url
+    assert 'Signature=' in url